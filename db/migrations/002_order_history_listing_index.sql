@@ -0,0 +1,5 @@
+-- Composite index for filtered, newest-first order listings (/orders)
+-- Version: 002
+
+CREATE INDEX IF NOT EXISTS ix_order_history_status_symbol_created_at
+    ON order_history (status, symbol, created_at DESC);
@@ -0,0 +1,6 @@
+-- Store order_result as JSONB so it can be queried with JSON operators
+-- Version: 003
+-- Existing rows hold a text dump of the result dict; they are kept as JSON strings
+
+ALTER TABLE order_history
+    ALTER COLUMN order_result TYPE JSONB USING to_jsonb(order_result);
@@ -0,0 +1,9 @@
+-- Indexes for /orders and /orders/export filtered by only symbol or only status,
+-- newest first (the status+symbol case is covered by 002)
+-- Version: 004
+
+CREATE INDEX IF NOT EXISTS ix_order_history_symbol_created_at
+    ON order_history (symbol, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS ix_order_history_status_created_at
+    ON order_history (status, created_at DESC);
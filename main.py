@@ -1,48 +1,55 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 import csv
 from datetime import datetime
+import functools
+import hmac
 import io
 import logging
 import os
 import time
-from typing import Literal, Optional
+from typing import Literal, Optional, Union
 
-from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Header, Query
+from fastapi import Depends, FastAPI, HTTPException, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field, model_validator
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError, OperationalError
-
-from database import get_db, SessionLocal
+import orjson
+from pydantic import BaseModel, ConfigDict, Field
+import redis
+from sqlalchemy import bindparam, func, select, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+
+from database import AsyncSessionLocal, get_db
 from models import OrderHistory
-from trading_queue import get_queue_client, TradingQueueClient
+from trading_queue import AsyncTradingQueueClient, SharedCalls, TradingEventListener, get_async_queue_client
 
 logger = logging.getLogger(__name__)
 
 
 ACCEPT_ACTIONS = Literal["long_entry", "long_exit", "short_entry", "short_exit"]
 AUTH_KEY = os.getenv("AUTH_KEY", "changeme")
+AUTH_KEY_BYTES = AUTH_KEY.encode()
 
 
 async def verify_auth_key(x_auth_key: str = Header(..., alias="X-Auth-Key")):
-    if x_auth_key != AUTH_KEY:
+    # Constant-time comparison so response timing doesn't leak the key
+    if not hmac.compare_digest(x_auth_key.encode(), AUTH_KEY_BYTES):
         raise HTTPException(status_code=401, detail="Invalid authentication key")
     return x_auth_key
 
 
+def get_queue_client(request: Request) -> AsyncTradingQueueClient:
+    """Queue client shared by all requests, created once in lifespan."""
+    return request.app.state.queue_client
+
+
 class OrderRequest(BaseModel):
     action: ACCEPT_ACTIONS
     quantity: int = Field(..., gt=0)
-    symbol: str
-
-    @model_validator(mode="after")
-    def validate_symbol(self):
-        # Symbol validation is now done via the trading worker
-        # We'll validate during order processing instead
-        return self
+    symbol: str  # Validated by the trading worker when the order is placed
 
 
 class OrderHistoryResponse(BaseModel):
@@ -52,7 +59,7 @@ class OrderHistoryResponse(BaseModel):
     action: str
     quantity: int
     status: str
-    order_result: Optional[str]
+    order_result: Union[dict, str, None]  # str only for rows stored before JSONB
     error_message: Optional[str]
     created_at: datetime
     order_id: Optional[str] = None
@@ -61,35 +68,137 @@ class OrderHistoryResponse(BaseModel):
     fill_price: Optional[float] = None
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+
+DB_HEARTBEAT_INTERVAL = 30  # seconds between database liveness probes
+
+
+async def db_heartbeat(app: FastAPI):
+    """Probe the database periodically and keep app.state.db_healthy current for /health."""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("SELECT 1"))
+            if app.state.db_healthy is False:
+                logger.info("Database connection restored")
+            app.state.db_healthy = True
+        except (SQLAlchemyError, OSError) as e:
+            if app.state.db_healthy is not False:
+                logger.warning(f"Database heartbeat failed: {e}")
+            app.state.db_healthy = False
+        await asyncio.sleep(DB_HEARTBEAT_INTERVAL)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup - database migrations are handled by separate migration service
+    app.state.queue_client = get_async_queue_client()
+    try:
+        await app.state.queue_client.warm_up()
+    except redis.RedisError as e:
+        logger.warning(f"Redis pool warm-up failed, connecting on demand: {e}")
+    app.state.trading_events = TradingEventListener()
+    events_task = asyncio.create_task(app.state.trading_events.run())
+    app.state.db_healthy = None  # unknown until the first probe
+    db_heartbeat_task = asyncio.create_task(db_heartbeat(app))
     yield
-    # Shutdown (cleanup if needed)
+    # Shutdown
+    events_task.cancel()
+    db_heartbeat_task.cancel()
+    if VERIFY_TASKS:
+        logger.warning(f"Cancelling {len(VERIFY_TASKS)} pending order verifications; use /orders/{{id}}/recheck after restart")
+        for task in VERIFY_TASKS:
+            task.cancel()
+        await asyncio.gather(*VERIFY_TASKS, return_exceptions=True)
 
 
 app = FastAPI(lifespan=lifespan)
 
+# Comma-separated CORS origins; "*" (default) allows any origin without credentials.
+# Auth uses the X-Auth-Key header, so the dashboard does not need credentialed CORS.
+ALLOWED_ORIGINS = [o.strip() for o in os.getenv("ALLOWED_ORIGINS", "*").split(",") if o.strip()]
+ALLOW_ANY_ORIGIN = ALLOWED_ORIGINS == ["*"]
+if ALLOW_ANY_ORIGIN:
+    logger.info("CORS allows any origin; credentialed cross-origin requests are disabled")
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=ALLOWED_ORIGINS,
+    allow_credentials=not ALLOW_ANY_ORIGIN,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
-# Background task configuration
-ORDER_STATUS_CHECK_DELAY = 2  # seconds to wait before first check
-ORDER_STATUS_CHECK_INTERVAL = 5  # seconds between retry checks
-ORDER_STATUS_MAX_RETRIES = 120  # max number of status checks (~10 minutes total)
+# Background task configuration: status checks back off geometrically, so
+# quick fills are seen within a second while slow orders are polled rarely.
+# Order events published by the worker cut a wait short, so the cap is only
+# the fallback when an event is missed.
+ORDER_STATUS_POLL_MIN = 0.2  # seconds before the first check
+ORDER_STATUS_POLL_MAX = 30.0  # max seconds between checks
+ORDER_STATUS_POLL_FACTOR = 1.6  # growth of the delay after each check
+ORDER_STATUS_POLL_BUDGET = 600  # stop verifying after ~10 minutes
+# Paper-trading orders fill or reject within milliseconds, so simulation
+# checks start sooner and stay dense, but give up after 30s; a slower
+# simulated order is left 'submitted' for /orders/{id}/recheck
+ORDER_STATUS_SIM_POLL_MIN = 0.05
+ORDER_STATUS_SIM_POLL_MAX = 1.0
+ORDER_STATUS_SIM_POLL_FACTOR = 2.0
+ORDER_STATUS_SIM_POLL_BUDGET = 30
+ORDER_STATUS_DB_RETRIES = 5  # consecutive DB failures tolerated before giving up
+
+# Server-side UTC timestamp for updated_at (naive UTC, matching created_at)
+DB_UTC_NOW = func.timezone("UTC", func.now())
+
+# Exchange fill status -> (order status, terminal). Unlisted statuses leave the
+# order status unchanged; terminal ones end background verification.
+STATUS_ACTIONS = {
+    "Filled": ("filled", True),
+    "PartFilled": ("partial_filled", False),
+    "Cancelled": ("cancelled", True),
+    "Inactive": ("cancelled", True),
+    "PendingSubmit": ("submitted", False),
+    "PreSubmitted": ("submitted", False),
+    "Submitted": ("submitted", False),
+    "Failed": ("failed", True),
+}
+
+# One round-trip per status change in verify_order_fill: no SELECT, no ORM
+# change tracking. NULL b_status / b_error_message keep the stored value.
+ORDER_FILL_UPDATE = (
+    update(OrderHistory)
+    .where(OrderHistory.id == bindparam("b_id"))
+    .values(
+        fill_status=bindparam("b_fill_status"),
+        order_id=bindparam("b_order_id"),
+        seqno=bindparam("b_seqno"),
+        ordno=bindparam("b_ordno"),
+        fill_quantity=bindparam("b_fill_quantity"),
+        fill_price=bindparam("b_fill_price"),
+        cancel_quantity=bindparam("b_cancel_quantity"),
+        status=func.coalesce(bindparam("b_status"), OrderHistory.status),
+        error_message=func.coalesce(bindparam("b_error_message"), OrderHistory.error_message),
+        updated_at=DB_UTC_NOW,
+    )
+    .execution_options(synchronize_session=False)
+)
 
 
-def verify_order_fill(
+async def wait_for_order_update(order_event: asyncio.Event, timeout: float) -> bool:
+    """Wait up to timeout seconds for an order event; True if one arrived."""
+    try:
+        await asyncio.wait_for(order_event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        # Events arriving during the following check set it again
+        order_event.clear()
+
+
+async def verify_order_fill(
     order_id: int,
     trade_order_id: str,
     trade_seqno: str,
@@ -105,75 +214,48 @@ def verify_order_fill(
     """
     logger.info(f"[BG] Starting order verification: order_id={order_id}, simulation={simulation}")
     
-    # Wait before first check to allow order to reach exchange
-    logger.debug(f"[BG] Waiting {ORDER_STATUS_CHECK_DELAY}s before first check...")
-    time.sleep(ORDER_STATUS_CHECK_DELAY)
-    
-    # Database connection with retry logic
-    db = None
-    db_max_retries = 3
-    
-    def get_db_session():
-        """Get a new database session with retry logic."""
-        nonlocal db
-        for retry in range(db_max_retries):
-            try:
-                if db is not None:
-                    try:
-                        db.close()
-                    except Exception:
-                        pass
-                db = SessionLocal()
-                # Test connection
-                db.execute(text("SELECT 1"))
-                return db
-            except OperationalError as e:
-                logger.warning(f"[BG] DB connection failed (attempt {retry + 1}/{db_max_retries}): {e}")
-                time.sleep(2 ** retry)  # Exponential backoff: 1s, 2s, 4s
-        raise OperationalError("Failed to connect to database after retries", None, None)
-    
-    def safe_db_commit():
-        """Safely commit with error handling."""
-        nonlocal db
-        try:
-            db.commit()
-            return True
-        except OperationalError as e:
-            logger.error(f"[BG] DB commit failed (connection error): {e}")
-            try:
-                db.rollback()
-            except Exception:
-                pass
-            # Try to reconnect
-            try:
-                db = get_db_session()
-                return False  # Caller should retry the operation
-            except Exception:
-                return False
-        except SQLAlchemyError as e:
-            logger.error(f"[BG] DB commit failed: {e}")
-            try:
-                db.rollback()
-            except Exception:
-                pass
-            return False
-    
     last_status = None
-    order_record = None
+    order_status = "submitted"  # set by create_order before verification starts
+    last_written = None
+    db_failures = 0
+    # Woken by worker order events via the process-wide pub/sub listener
+    trading_events = app.state.trading_events
+    order_event = trading_events.watch_order(trade_order_id)
+    # Stale pooled connections are replaced by pool_pre_ping at checkout
+    db = AsyncSessionLocal()
     
     try:
-        # Initialize database connection
-        db = get_db_session()
-        logger.debug(f"[BG] Database connection established")
-        
         # Get queue client for status checks
-        queue_client = get_queue_client()
-        logger.info(f"[BG] Queue client ready, starting status checks (max {ORDER_STATUS_MAX_RETRIES} checks, {ORDER_STATUS_CHECK_INTERVAL}s interval)")
+        queue_client = get_async_queue_client()
+        if simulation:
+            poll_min, poll_max, poll_factor, poll_budget = (
+                ORDER_STATUS_SIM_POLL_MIN, ORDER_STATUS_SIM_POLL_MAX,
+                ORDER_STATUS_SIM_POLL_FACTOR, ORDER_STATUS_SIM_POLL_BUDGET,
+            )
+        else:
+            poll_min, poll_max, poll_factor, poll_budget = (
+                ORDER_STATUS_POLL_MIN, ORDER_STATUS_POLL_MAX,
+                ORDER_STATUS_POLL_FACTOR, ORDER_STATUS_POLL_BUDGET,
+            )
+        logger.info(f"[BG] Queue client ready, starting status checks (up to {poll_budget}s)")
+        
+        started = time.monotonic()
+        deadline = started + poll_budget
+        next_progress_log = started + 60
+        delay = poll_min
+        attempt = 0
         
-        for attempt in range(ORDER_STATUS_MAX_RETRIES):
+        while time.monotonic() + delay < deadline:
+            # Wait before each check; the first wait lets the order reach the exchange.
+            # An order/deal event from the worker ends the wait early.
+            if await wait_for_order_update(order_event, delay):
+                logger.debug(f"[BG] Order {order_id} event received, checking now")
+            delay = min(poll_max, delay * poll_factor)
+            attempt += 1
+            
             # Check order status via queue
             try:
-                response = queue_client.check_order_status(
+                response = await queue_client.check_order_status(
                     order_id=trade_order_id,
                     seqno=trade_seqno,
                     simulation=simulation,
@@ -181,148 +263,195 @@ def verify_order_fill(
                 
                 if not response.success:
                     logger.warning(f"[BG] Status check failed: {response.error}")
-                    time.sleep(ORDER_STATUS_CHECK_INTERVAL)
                     continue
                     
                 status_info = response.data
             except (TimeoutError, ConnectionError) as e:
                 logger.warning(f"[BG] Queue error during status check: {e}")
-                time.sleep(ORDER_STATUS_CHECK_INTERVAL)
                 continue
             
             fill_status = status_info.get("status", "unknown")
+            deal_quantity = status_info.get("deal_quantity", 0)
+            cancel_quantity = status_info.get("cancel_quantity", 0)
+            fill_price = status_info.get("fill_avg_price")
+            seqno = status_info.get("seqno")
+            ordno = status_info.get("ordno")
             
-            # Log status change or periodic update (every 12 checks = ~1 minute)
+            # Log status change or periodic update (~every minute)
             if fill_status != last_status:
                 logger.info(f"[BG] Order {order_id} status changed: {last_status} -> {fill_status}")
                 last_status = fill_status
-            elif attempt % 12 == 0 and attempt > 0:
-                elapsed = attempt * ORDER_STATUS_CHECK_INTERVAL
-                logger.info(f"[BG] Order {order_id} still {fill_status} after {elapsed}s ({attempt}/{ORDER_STATUS_MAX_RETRIES} checks)")
+            elif time.monotonic() >= next_progress_log:
+                elapsed = time.monotonic() - started
+                logger.info(f"[BG] Order {order_id} still {fill_status} after {elapsed:.0f}s ({attempt} checks)")
+                next_progress_log += 60
             
-            # Log detailed status info at debug level
-            logger.debug(
-                f"[BG] Check {attempt + 1}/{ORDER_STATUS_MAX_RETRIES}: "
-                f"status={fill_status}, "
-                f"deal_qty={status_info.get('deal_quantity', 0)}, "
-                f"cancel_qty={status_info.get('cancel_quantity', 0)}, "
-                f"order_qty={status_info.get('order_quantity', 0)}, "
-                f"seqno={status_info.get('seqno')}, "
-                f"ordno={status_info.get('ordno')}"
-            )
+            # Log detailed status info at debug level (skip formatting when disabled)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"[BG] Check {attempt}: "
+                    f"status={fill_status}, "
+                    f"deal_qty={deal_quantity}, "
+                    f"cancel_qty={cancel_quantity}, "
+                    f"order_qty={status_info.get('order_quantity', 0)}, "
+                    f"seqno={seqno}, "
+                    f"ordno={ordno}"
+                )
             
-            # Log deals if any
+            # Log deals if any, as one record however many partial fills there are
             deals = status_info.get("deals", [])
             if deals:
-                for deal in deals:
-                    logger.info(f"[BG] Order {order_id} DEAL: qty={deal.get('quantity')}, price={deal.get('price')}, ts={deal.get('ts')}")
+                deal_summary = ", ".join(
+                    f"qty={d.get('quantity')}@{d.get('price')} ts={d.get('ts')}" for d in deals
+                )
+                logger.info(f"[BG] Order {order_id} DEALS: {deal_summary}")
             
-            # Update database record with error handling
-            try:
-                order_record = db.query(OrderHistory).filter(OrderHistory.id == order_id).first()
-            except OperationalError as e:
-                logger.warning(f"[BG] DB query failed, reconnecting: {e}")
+            # Skip the write when nothing persisted has changed, so an order that
+            # sits in Submitted doesn't commit the same row on every check
+            snapshot = (
+                fill_status,
+                status_info.get("order_id"),
+                seqno,
+                ordno,
+                deal_quantity,
+                fill_price,
+                cancel_quantity,
+            )
+            new_status, terminal = STATUS_ACTIONS.get(fill_status, (None, False))
+            if fill_status == "Failed":
+                error_message = status_info.get("msg") or status_info.get("error", "Order failed at exchange")
+            else:
+                error_message = None
+            
+            if snapshot != last_written:
+                # Update database record. Dead pooled connections are already handled
+                # by pool_pre_ping, so a failure here means the database is unreachable:
+                # retry on the next check, a bounded number of times. asyncpg surfaces
+                # refused connections as raw OSError and server disconnects as DBAPIError
                 try:
-                    db = get_db_session()
-                    order_record = db.query(OrderHistory).filter(OrderHistory.id == order_id).first()
-                except Exception as reconnect_error:
-                    logger.error(f"[BG] DB reconnect failed: {reconnect_error}")
-                    time.sleep(ORDER_STATUS_CHECK_INTERVAL)
+                    result = await db.execute(ORDER_FILL_UPDATE, {
+                        "b_id": order_id,
+                        "b_fill_status": fill_status,
+                        "b_order_id": status_info.get("order_id"),
+                        "b_seqno": seqno,
+                        "b_ordno": ordno,
+                        "b_fill_quantity": deal_quantity,
+                        "b_fill_price": fill_price,
+                        "b_cancel_quantity": cancel_quantity,
+                        "b_status": new_status,
+                        "b_error_message": error_message,
+                    })
+                    if result.rowcount == 0:
+                        logger.error(f"[BG] Order record not found in database: order_id={order_id}")
+                        await db.rollback()
+                        continue
+                    await db.commit()
+                    last_written = snapshot
+                    order_status = new_status or order_status
+                    db_failures = 0
+                except (DBAPIError, OSError) as e:
+                    db_failures += 1
+                    if db_failures > ORDER_STATUS_DB_RETRIES:
+                        raise
+                    logger.warning(f"[BG] DB update failed ({db_failures}/{ORDER_STATUS_DB_RETRIES}), retrying on next check: {e}")
+                    # The connection may be gone; the next execute checks out a fresh one
+                    with suppress(DBAPIError, OSError):
+                        await db.rollback()
                     continue
             
-            if order_record:
-                order_record.fill_status = fill_status
-                order_record.order_id = status_info.get("order_id")
-                order_record.seqno = status_info.get("seqno")
-                order_record.ordno = status_info.get("ordno")
-                order_record.fill_quantity = status_info.get("deal_quantity", 0)
-                order_record.fill_price = status_info.get("fill_avg_price")
-                order_record.cancel_quantity = status_info.get("cancel_quantity", 0)
-                order_record.updated_at = datetime.utcnow()
-                
-                # Update main status based on fill status
-                if fill_status == "Filled":
-                    order_record.status = "filled"
-                    if safe_db_commit():
-                        logger.info(
-                            f"[BG] ✓ Order {order_id} FILLED: "
-                            f"qty={status_info.get('deal_quantity')}, "
-                            f"avg_price={status_info.get('fill_avg_price')}, "
-                            f"deals={len(deals)}"
-                        )
-                        break
-                elif fill_status == "PartFilled":
-                    order_record.status = "partial_filled"
-                    if safe_db_commit():
-                        logger.info(
-                            f"[BG] ~ Order {order_id} PARTIAL: "
-                            f"filled={status_info.get('deal_quantity')}/{status_info.get('order_quantity')}, "
-                            f"avg_price={status_info.get('fill_avg_price')}"
-                        )
-                    # Continue checking for more fills
-                elif fill_status == "Cancelled":
-                    order_record.status = "cancelled"
-                    if safe_db_commit():
-                        logger.info(
-                            f"[BG] ✗ Order {order_id} CANCELLED: "
-                            f"cancel_qty={status_info.get('cancel_quantity')}, "
-                            f"msg={status_info.get('msg')}"
-                        )
-                        break
-                elif fill_status == "Inactive":
-                    order_record.status = "cancelled"
-                    if safe_db_commit():
-                        logger.info(f"[BG] ✗ Order {order_id} INACTIVE (expired/rejected): msg={status_info.get('msg')}")
-                        break
-                elif fill_status in ("PendingSubmit", "PreSubmitted", "Submitted"):
-                    order_record.status = "submitted"
-                    safe_db_commit()
-                    # Already logged above
-                elif fill_status == "Failed":
-                    order_record.status = "failed"
-                    error_msg = status_info.get("msg") or status_info.get("error", "Order failed at exchange")
-                    order_record.error_message = error_msg
-                    if safe_db_commit():
-                        logger.error(f"[BG] ✗ Order {order_id} FAILED: {error_msg}, status_code={status_info.get('status_code')}")
-                        break
-                elif fill_status == "error":
-                    logger.error(f"[BG] Error checking order {order_id}: {status_info.get('error')}")
-                    safe_db_commit()
-                else:
-                    safe_db_commit()
-                    logger.warning(f"[BG] Order {order_id} unknown status: {fill_status}")
+            if fill_status == "Filled":
+                logger.info(
+                    f"[BG] ✓ Order {order_id} FILLED: "
+                    f"qty={deal_quantity}, "
+                    f"avg_price={fill_price}, "
+                    f"deals={len(deals)}"
+                )
+            elif fill_status == "PartFilled":
+                logger.info(
+                    f"[BG] ~ Order {order_id} PARTIAL: "
+                    f"filled={deal_quantity}/{status_info.get('order_quantity')}, "
+                    f"avg_price={fill_price}"
+                )
+                # Continue checking for more fills
+            elif fill_status == "Cancelled":
+                logger.info(
+                    f"[BG] ✗ Order {order_id} CANCELLED: "
+                    f"cancel_qty={cancel_quantity}, "
+                    f"msg={status_info.get('msg')}"
+                )
+            elif fill_status == "Inactive":
+                logger.info(f"[BG] ✗ Order {order_id} INACTIVE (expired/rejected): msg={status_info.get('msg')}")
+            elif fill_status in ("PendingSubmit", "PreSubmitted", "Submitted"):
+                pass  # Already logged above
+            elif fill_status == "Failed":
+                logger.error(f"[BG] ✗ Order {order_id} FAILED: {error_message}, status_code={status_info.get('status_code')}")
+            elif fill_status == "error":
+                logger.error(f"[BG] Error checking order {order_id}: {status_info.get('error')}")
             else:
-                logger.error(f"[BG] Order record not found in database: order_id={order_id}")
+                logger.warning(f"[BG] Order {order_id} unknown status: {fill_status}")
             
-            # Wait before next check
-            time.sleep(ORDER_STATUS_CHECK_INTERVAL)
+            if terminal:
+                break
         
-        # Final status after all retries
-        if order_record and order_record.status == "submitted":
-            total_time = ORDER_STATUS_CHECK_DELAY + (ORDER_STATUS_MAX_RETRIES * ORDER_STATUS_CHECK_INTERVAL)
+        # Final status after the polling budget is spent
+        if last_written is not None and order_status == "submitted":
+            total_time = time.monotonic() - started
             logger.warning(
-                f"[BG] ⚠ Order {order_id} timeout: still '{fill_status}' after {total_time}s "
-                f"({ORDER_STATUS_MAX_RETRIES} checks). Last status_code={status_info.get('status_code')}"
+                f"[BG] ⚠ Order {order_id} timeout: still '{fill_status}' after {total_time:.0f}s "
+                f"({attempt} checks). Last status_code={status_info.get('status_code')}"
             )
             
-    except OperationalError as e:
+    except (DBAPIError, OSError) as e:
         logger.error(f"[BG] Database connection error for order {order_id}: {e}")
     except SQLAlchemyError as e:
         logger.error(f"[BG] Database error for order {order_id}: {e}")
     except Exception as e:
         logger.exception(f"[BG] Error verifying order {order_id}: {e}")
     finally:
-        if db is not None:
-            try:
-                db.close()
-            except Exception as e:
-                logger.debug(f"[BG] Error closing DB session: {e}")
+        try:
+            await db.close()
+        except Exception as e:
+            logger.debug(f"[BG] Error closing DB session: {e}")
+        trading_events.unwatch_order(trade_order_id)
         logger.debug(f"[BG] Order {order_id} verification completed")
 
 
+# The event loop only holds weak references to tasks, so keep running
+# verifications here until they finish
+VERIFY_TASKS: set = set()
+
+
+def spawn_order_verification(**kwargs):
+    """Run verify_order_fill as an event-loop task that outlives the request."""
+    task = asyncio.create_task(verify_order_fill(**kwargs))
+    VERIFY_TASKS.add(task)
+    task.add_done_callback(VERIFY_TASKS.discard)
+
+
+def trading_service_errors(endpoint):
+    """Map trading worker timeouts and Redis outages to 503 responses."""
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        except (TimeoutError, ConnectionError) as e:
+            raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
+    return wrapper
+
+
+def worker_data_response(data) -> Response:
+    """
+    Send worker data as JSON via orjson. The payload is plain JSON decoded from
+    the queue, so FastAPI's jsonable_encoder pass and stdlib json are skipped.
+    """
+    return Response(content=orjson.dumps(data), media_type="application/json")
+
+
 @app.get("/futures")
+@trading_service_errors
 async def list_futures_products(
     simulation: bool = Query(True, description="Use simulation mode"),
+    queue_client: AsyncTradingQueueClient = Depends(get_queue_client),
 ):
     """
     Get all available futures products (first level).
@@ -330,149 +459,151 @@ async def list_futures_products(
     Returns a list of product codes (e.g., TXF, MXF, EXF) with their names.
     Use /futures/{code} to see all contracts for a specific product.
     """
-    try:
-        queue_client = get_queue_client()
-        response = queue_client.get_futures_overview(simulation=simulation)
-        
-        if not response.success:
-            raise HTTPException(status_code=503, detail=response.error)
-        
-        # Transform the response to match the expected format
-        products = []
-        for p in response.data.get("products", []):
-            contracts = p.get("contracts", [])
-            if contracts:
-                products.append({
-                    "code": p["product"],
-                    "name": contracts[0].get("name", "N/A"),
-                    "contract_count": len(contracts),
-                })
-        
-        # Sort by code
-        products.sort(key=lambda x: x['code'])
-        
-        return {
-            "products": products,
-            "count": len(products),
-        }
-    except (TimeoutError, ConnectionError) as e:
-        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
+    response = await queue_client.get_futures_overview(simulation=simulation)
+    
+    if not response.success:
+        raise HTTPException(status_code=503, detail=response.error)
+    
+    # Transform the response to match the expected format
+    products = []
+    for p in response.data.get("products", []):
+        contracts = p.get("contracts", [])
+        if contracts:
+            products.append({
+                "code": p["product"],
+                "name": contracts[0].get("name", "N/A"),
+                "contract_count": len(contracts),
+            })
+    
+    # Sort by code
+    products.sort(key=lambda x: x['code'])
+    
+    return {
+        "products": products,
+        "count": len(products),
+    }
 
 
 @app.get("/futures/{code}")
+@trading_service_errors
 async def list_futures_contracts(
     code: str,
     simulation: bool = Query(True, description="Use simulation mode"),
+    queue_client: AsyncTradingQueueClient = Depends(get_queue_client),
 ):
     """
     Get all contracts for a specific futures product (second level).
     
     Example: /futures/TXF returns all TXF contracts (TXFK5, TXFL5, etc.)
     """
-    try:
-        queue_client = get_queue_client()
-        response = queue_client.get_product_contracts(product=code, simulation=simulation)
-        
-        if not response.success:
-            if "not found" in (response.error or "").lower():
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Futures product '{code}' not found. Use /futures to see available products."
-                )
-            raise HTTPException(status_code=503, detail=response.error)
-        
-        contracts = response.data.get("contracts", [])
-        
-        return {
-            "product_code": code.upper(),
-            "product_name": contracts[0].get('name', 'N/A') if contracts else 'N/A',
-            "contracts": contracts,
-            "count": len(contracts),
-        }
-    except (TimeoutError, ConnectionError) as e:
-        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
+    response = await queue_client.get_product_contracts(product=code, simulation=simulation)
+    
+    if not response.success:
+        if "not found" in (response.error or "").lower():
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Futures product '{code}' not found. Use /futures to see available products."
+            )
+        raise HTTPException(status_code=503, detail=response.error)
+    
+    contracts = response.data.get("contracts", [])
+    
+    return {
+        "product_code": code.upper(),
+        "product_name": contracts[0].get('name', 'N/A') if contracts else 'N/A',
+        "contracts": contracts,
+        "count": len(contracts),
+    }
 
 
 @app.get("/symbols")
+@trading_service_errors
 async def list_symbols(
     simulation: bool = Query(True, description="Use simulation mode"),
+    queue_client: AsyncTradingQueueClient = Depends(get_queue_client),
 ):
     """Get list of valid trading symbols from SUPPORTED_FUTURES (configured in ENV)."""
-    try:
-        queue_client = get_queue_client()
-        response = queue_client.get_symbols(simulation=simulation)
-        
-        if not response.success:
-            raise HTTPException(status_code=503, detail=response.error)
-        
-        return response.data
-    except (TimeoutError, ConnectionError) as e:
-        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
+    response = await queue_client.get_symbols(simulation=simulation)
+    
+    if not response.success:
+        raise HTTPException(status_code=503, detail=response.error)
+    
+    return worker_data_response(response.data)
 
 
 @app.get("/symbols/{symbol}")
+@trading_service_errors
 async def get_symbol_details(
     symbol: str,
     simulation: bool = Query(True, description="Use simulation mode"),
+    queue_client: AsyncTradingQueueClient = Depends(get_queue_client),
 ):
     """Get detailed information about a specific symbol."""
-    try:
-        queue_client = get_queue_client()
-        response = queue_client.get_symbol_info(symbol=symbol, simulation=simulation)
-        
-        if not response.success:
-            if "not found" in (response.error or "").lower():
-                raise HTTPException(status_code=404, detail=response.error)
-            raise HTTPException(status_code=503, detail=response.error)
-        
-        return response.data
-    except (TimeoutError, ConnectionError) as e:
-        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
+    response = await queue_client.get_symbol_info(symbol=symbol, simulation=simulation)
+    
+    if not response.success:
+        if "not found" in (response.error or "").lower():
+            raise HTTPException(status_code=404, detail=response.error)
+        raise HTTPException(status_code=503, detail=response.error)
+    
+    return worker_data_response(response.data)
 
 
 @app.get("/contracts")
+@trading_service_errors
 async def list_contracts(
     simulation: bool = Query(True, description="Use simulation mode"),
+    queue_client: AsyncTradingQueueClient = Depends(get_queue_client),
 ):
     """Get list of valid contract codes."""
-    try:
-        queue_client = get_queue_client()
-        response = queue_client.get_contract_codes(simulation=simulation)
-        
-        if not response.success:
-            raise HTTPException(status_code=503, detail=response.error)
-        
-        return response.data
-    except (TimeoutError, ConnectionError) as e:
-        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
+    response = await queue_client.get_contract_codes(simulation=simulation)
+    
+    if not response.success:
+        raise HTTPException(status_code=503, detail=response.error)
+    
+    return worker_data_response(response.data)
 
 
 @app.get("/positions")
+@trading_service_errors
 async def list_positions(
     _: str = Depends(verify_auth_key),
     simulation: bool = Query(True, description="Use simulation mode"),
+    queue_client: AsyncTradingQueueClient = Depends(get_queue_client),
 ):
     """Get current futures/options positions. Ref: https://sinotrade.github.io/zh/tutor/accounting/position/"""
-    try:
-        queue_client = get_queue_client()
-        response = queue_client.get_positions(simulation=simulation)
-        
-        if not response.success:
-            raise HTTPException(status_code=503, detail=response.error)
-        
-        return response.data
-    except (TimeoutError, ConnectionError) as e:
-        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    response = await queue_client.get_positions(simulation=simulation)
+    
+    if not response.success:
+        raise HTTPException(status_code=503, detail=response.error)
+    
+    return worker_data_response(response.data)
+
+
+# Queue call for each order action. Exits ignore the requested quantity;
+# the worker closes the whole open position.
+ORDER_DISPATCH = {
+    "long_entry": lambda client, order, simulation: client.place_entry_order(
+        symbol=order.symbol, quantity=order.quantity, action="Buy", simulation=simulation
+    ),
+    "short_entry": lambda client, order, simulation: client.place_entry_order(
+        symbol=order.symbol, quantity=order.quantity, action="Sell", simulation=simulation
+    ),
+    "long_exit": lambda client, order, simulation: client.place_exit_order(
+        symbol=order.symbol, position_direction="Buy", simulation=simulation
+    ),
+    "short_exit": lambda client, order, simulation: client.place_exit_order(
+        symbol=order.symbol, position_direction="Sell", simulation=simulation
+    ),
+}
 
 
 @app.post("/order")
 async def create_order(
     order_request: OrderRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     simulation: bool = Query(True, description="Use simulation mode (default: True)"),
+    queue_client: AsyncTradingQueueClient = Depends(get_queue_client),
 ):
     """
     Place a trading order. The order is submitted and a background task verifies
@@ -491,63 +622,28 @@ async def create_order(
         fill_status="PendingSubmit",
     )
 
+    place_order = ORDER_DISPATCH[order_request.action]
     try:
-        queue_client = get_queue_client()
-    except (ConnectionError, Exception) as e:
+        response = await place_order(queue_client, order_request, simulation)
+    except (TimeoutError, ConnectionError) as e:
         order_history.status = "failed"
         order_history.error_message = str(e)
         db.add(order_history)
-        db.commit()
-        raise HTTPException(status_code=503, detail=str(e))
+        await db.commit()
+        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
 
-    response = None
-    try:
-        if order_request.action == "long_entry":
-            response = queue_client.place_entry_order(
-                symbol=order_request.symbol,
-                quantity=order_request.quantity,
-                action="Buy",
-                simulation=simulation,
-            )
-        elif order_request.action == "short_entry":
-            response = queue_client.place_entry_order(
-                symbol=order_request.symbol,
-                quantity=order_request.quantity,
-                action="Sell",
-                simulation=simulation,
-            )
-        elif order_request.action == "long_exit":
-            response = queue_client.place_exit_order(
-                symbol=order_request.symbol,
-                position_direction="Buy",
-                simulation=simulation,
-            )
-        elif order_request.action == "short_exit":
-            response = queue_client.place_exit_order(
-                symbol=order_request.symbol,
-                position_direction="Sell",
-                simulation=simulation,
-            )
-            
-        if response and not response.success:
-            order_history.status = "failed"
-            order_history.error_message = response.error
-            db.add(order_history)
-            db.commit()
-            raise HTTPException(status_code=400, detail=response.error)
-            
-    except (TimeoutError, ConnectionError) as e:
+    if response and not response.success:
         order_history.status = "failed"
-        order_history.error_message = str(e)
+        order_history.error_message = response.error
         db.add(order_history)
-        db.commit()
-        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
+        await db.commit()
+        raise HTTPException(status_code=400, detail=response.error)
 
     if response is None or response.data is None:
         order_history.status = "failed"
         order_history.error_message = "No response from trading service"
         db.add(order_history)
-        db.commit()
+        await db.commit()
         raise HTTPException(status_code=500, detail="No response from trading service")
 
     result_data = response.data
@@ -557,7 +653,7 @@ async def create_order(
         order_history.status = "no_action"
         order_history.fill_status = None
         db.add(order_history)
-        db.commit()
+        await db.commit()
         return {"status": "no_action", "message": result_data.get("message", "No position to exit or invalid action")}
 
     # Extract order info from result
@@ -579,15 +675,13 @@ async def create_order(
 
     # Initial status is "submitted" (order accepted, pending verification)
     order_history.status = "submitted"
-    order_history.order_result = str(result_data)
+    order_history.order_result = result_data
     db.add(order_history)
-    db.commit()
-    db.refresh(order_history)
+    await db.commit()  # INSERT ... RETURNING populates order_history.id
     
     # Spawn background task to verify fill status
     if result_data.get("order_id") and result_data.get("seqno"):
-        background_tasks.add_task(
-            verify_order_fill,
+        spawn_order_verification(
             order_id=order_history.id,
             trade_order_id=result_data.get("order_id"),
             trade_seqno=result_data.get("seqno"),
@@ -602,9 +696,22 @@ async def create_order(
     }
 
 
-@app.get("/orders", response_model=list[OrderHistoryResponse])
+def encode_order_cursor(order: OrderHistory) -> str:
+    return f"{order.created_at.isoformat()},{order.id}"
+
+
+def decode_order_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, order_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# Rows are encoded straight from to_dict() with orjson; the model only documents the schema
+@app.get("/orders", response_model=None, responses={200: {"model": list[OrderHistoryResponse]}})
 async def get_orders(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     _: str = Depends(verify_auth_key),
     symbol: Optional[str] = Query(None, description="Filter by symbol"),
     action: Optional[str] = Query(None, description="Filter by action"),
@@ -612,28 +719,109 @@ async def get_orders(
     start_date: Optional[datetime] = Query(None, description="Filter from date"),
     end_date: Optional[datetime] = Query(None, description="Filter to date"),
     limit: int = Query(100, ge=1, le=1000, description="Limit results"),
-    offset: int = Query(0, ge=0, description="Offset for pagination"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor: X-Next-Cursor header of the previous page"),
+    offset: int = Query(0, ge=0, description="Offset for pagination (use cursor instead)", deprecated=True),
 ):
-    query = db.query(OrderHistory)
+    """
+    List orders newest first. Full pages carry an X-Next-Cursor header; pass it
+    back as `cursor` to fetch the next page without scanning skipped rows.
+    """
+    query = select(OrderHistory)
 
     if symbol:
-        query = query.filter(OrderHistory.symbol == symbol)
+        query = query.where(OrderHistory.symbol == symbol)
     if action:
-        query = query.filter(OrderHistory.action == action)
+        query = query.where(OrderHistory.action == action)
     if status:
-        query = query.filter(OrderHistory.status == status)
+        query = query.where(OrderHistory.status == status)
     if start_date:
-        query = query.filter(OrderHistory.created_at >= start_date)
+        query = query.where(OrderHistory.created_at >= start_date)
     if end_date:
-        query = query.filter(OrderHistory.created_at <= end_date)
+        query = query.where(OrderHistory.created_at <= end_date)
+    if cursor:
+        # id breaks ties between orders created in the same microsecond
+        query = query.where(
+            tuple_(OrderHistory.created_at, OrderHistory.id) < decode_order_cursor(cursor)
+        )
+    elif offset:
+        query = query.offset(offset)
+
+    query = query.order_by(OrderHistory.created_at.desc(), OrderHistory.id.desc()).limit(limit)
+    result = await db.execute(query)
+    orders = result.scalars().all()
+
+    headers = {}
+    if len(orders) == limit and orders[-1].created_at:
+        headers["X-Next-Cursor"] = encode_order_cursor(orders[-1])
+    return Response(
+        content=orjson.dumps([order.to_dict() for order in orders]),
+        media_type="application/json",
+        headers=headers,
+    )
 
-    orders = query.order_by(OrderHistory.created_at.desc()).offset(offset).limit(limit).all()
-    return orders
+
+EXPORT_BATCH_SIZE = 1000  # rows fetched per round-trip while streaming an export
+EXPORT_CSV_CHUNK_ROWS = 500  # CSV rows per chunk written to the response
+EXPORT_CSV_HEADER = ["id", "symbol", "action", "quantity", "status", "order_result", "error_message", "created_at"]
+
+
+def export_order_result(value) -> Optional[str]:
+    """order_result as CSV text: JSON for result dicts, older text rows as stored."""
+    if value is None or isinstance(value, str):
+        return value
+    return orjson.dumps(value).decode()
+
+
+async def stream_order_export(query, format: str):
+    """
+    Yield an export chunk per batch of rows from a server-side cursor, so
+    memory stays flat and the first bytes go out before the query finishes.
+    """
+    # The session lives in the generator: it must stay open while the
+    # response streams, after the endpoint itself has returned
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+        if format == "json":
+            separator = b"["
+            async for orders in result.scalars().partitions():
+                chunk = bytearray()
+                for order in orders:
+                    chunk += separator
+                    chunk += orjson.dumps(order.to_dict())
+                    separator = b","
+                yield bytes(chunk)
+            yield b"]" if separator == b"," else b"[]"
+            return
+
+        # One small buffer is reused: drained every EXPORT_CSV_CHUNK_ROWS rows
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(EXPORT_CSV_HEADER)
+        rows = 0
+        async for orders in result.scalars().partitions():
+            for order in orders:
+                writer.writerow([
+                    order.id,
+                    order.symbol,
+                    order.action,
+                    order.quantity,
+                    order.status,
+                    export_order_result(order.order_result),
+                    order.error_message,
+                    order.created_at.isoformat() if order.created_at else "",
+                ])
+                rows += 1
+                if rows % EXPORT_CSV_CHUNK_ROWS == 0:
+                    yield output.getvalue().encode()
+                    output.seek(0)
+                    output.truncate()
+        if output.tell():
+            yield output.getvalue().encode()
 
 
 @app.get("/orders/export")
 async def export_orders(
-    db: Session = Depends(get_db),
     _: str = Depends(verify_auth_key),
     symbol: Optional[str] = Query(None, description="Filter by symbol"),
     action: Optional[str] = Query(None, description="Filter by action"),
@@ -642,82 +830,84 @@ async def export_orders(
     end_date: Optional[datetime] = Query(None, description="Filter to date"),
     format: str = Query("csv", description="Export format: csv or json"),
 ):
-    query = db.query(OrderHistory)
+    query = select(OrderHistory)
 
     if symbol:
-        query = query.filter(OrderHistory.symbol == symbol)
+        query = query.where(OrderHistory.symbol == symbol)
     if action:
-        query = query.filter(OrderHistory.action == action)
+        query = query.where(OrderHistory.action == action)
     if status:
-        query = query.filter(OrderHistory.status == status)
+        query = query.where(OrderHistory.status == status)
     if start_date:
-        query = query.filter(OrderHistory.created_at >= start_date)
+        query = query.where(OrderHistory.created_at >= start_date)
     if end_date:
-        query = query.filter(OrderHistory.created_at <= end_date)
+        query = query.where(OrderHistory.created_at <= end_date)
 
-    orders = query.order_by(OrderHistory.created_at.desc()).all()
+    query = query.order_by(OrderHistory.created_at.desc())
 
     if format == "json":
-        return [order.to_dict() for order in orders]
-
-    # CSV export
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["id", "symbol", "action", "quantity", "status", "order_result", "error_message", "created_at"])
-
-    for order in orders:
-        writer.writerow([
-            order.id,
-            order.symbol,
-            order.action,
-            order.quantity,
-            order.status,
-            order.order_result,
-            order.error_message,
-            order.created_at.isoformat() if order.created_at else "",
-        ])
-
-    output.seek(0)
+        return StreamingResponse(stream_order_export(query, "json"), media_type="application/json")
+
     return StreamingResponse(
-        iter([output.getvalue()]),
+        stream_order_export(query, "csv"),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=order_history.csv"},
     )
 
 
-@app.post("/orders/{order_id}/recheck")
-async def recheck_order_status(
-    order_id: int,
-    db: Session = Depends(get_db),
-    _: str = Depends(verify_auth_key),
-    simulation: bool = Query(True, description="Use simulation mode"),
-):
-    """
-    Manually re-check an order's fill status from the exchange.
-    
-    This performs a single status check (not a background loop) and updates the database.
-    Useful for orders where the background task may have timed out or for manual verification.
-    """
-    # Get order from database
-    order_record = db.query(OrderHistory).filter(OrderHistory.id == order_id).first()
-    if not order_record:
-        raise HTTPException(status_code=404, detail=f"Order {order_id} not found")
-    
-    # Check if order has the necessary info to re-check
-    if not order_record.seqno or not order_record.order_id:
-        raise HTTPException(
-            status_code=400, 
-            detail="Order does not have seqno/order_id - cannot re-check status. This may be a failed or no_action order."
+# Columns recheck reads; order_result and the rest are only ever written
+RECHECK_COLUMNS = load_only(
+    OrderHistory.id,
+    OrderHistory.order_id,
+    OrderHistory.seqno,
+    OrderHistory.ordno,
+    OrderHistory.status,
+    OrderHistory.fill_status,
+    OrderHistory.fill_price,
+    OrderHistory.error_message,
+)
+
+
+# Dashboard refreshes can fire many rechecks of the same order at once;
+# they share one status check and reuse its result for a short while
+RECHECK_CACHE_TTL = 2.0  # seconds
+_rechecks = SharedCalls()  # keyed by (order_id, simulation)
+
+
+async def run_order_recheck(order_id: int, simulation: bool) -> dict:
+    """Check one order's status on the exchange and write it to the database."""
+    # Own session: the check may outlive the request that started it
+    async with AsyncSessionLocal() as db:
+        # Get order from database
+        result = await db.execute(
+            select(OrderHistory)
+            .options(RECHECK_COLUMNS)
+            .where(OrderHistory.id == order_id)
         )
+        order_record = result.scalar_one_or_none()
+        if not order_record:
+            raise HTTPException(status_code=404, detail=f"Order {order_id} not found")
     
-    try:
-        queue_client = get_queue_client()
-        response = queue_client.check_order_status(
-            order_id=order_record.order_id,
-            seqno=order_record.seqno,
-            simulation=simulation,
-        )
-        
+        # Check if order has the necessary info to re-check
+        if not order_record.seqno or not order_record.order_id:
+            raise HTTPException(
+                status_code=400, 
+                detail="Order does not have seqno/order_id - cannot re-check status. This may be a failed or no_action order."
+            )
+    
+        queue_client = get_async_queue_client()
+        try:
+            response = await queue_client.check_order_status(
+                order_id=order_record.order_id,
+                seqno=order_record.seqno,
+                simulation=simulation,
+            )
+        except (TimeoutError, ConnectionError) as e:
+            raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
+        except Exception as e:
+            logger.exception(f"Error re-checking order {order_id}: {e}")
+            raise HTTPException(status_code=500, detail=f"Error checking order status: {e}")
+
         if not response.success:
             # Trade not found in current session - might have been from previous session
             if "not found" in (response.error or "").lower():
@@ -729,41 +919,35 @@ async def recheck_order_status(
                     "current_fill_status": order_record.fill_status,
                 }
             raise HTTPException(status_code=503, detail=response.error)
-        
+
         status_info = response.data
         fill_status = status_info.get("status", "unknown")
-        
+
         # Get deals and calculate average price
         deals = status_info.get("deals", [])
         deal_quantity = status_info.get("deal_quantity", 0)
         fill_avg_price = status_info.get("fill_avg_price", 0.0)
-        
+
         # Update database record
         old_status = order_record.status
         old_fill_status = order_record.fill_status
-        
+
         order_record.fill_status = fill_status
         order_record.ordno = status_info.get("ordno", order_record.ordno)
         order_record.fill_quantity = deal_quantity
         order_record.fill_price = fill_avg_price if fill_avg_price > 0 else order_record.fill_price
         order_record.cancel_quantity = status_info.get("cancel_quantity", 0)
-        order_record.updated_at = datetime.utcnow()
-        
-        # Update main status based on fill status
-        if fill_status == "Filled":
-            order_record.status = "filled"
-        elif fill_status == "PartFilled":
-            order_record.status = "partial_filled"
-        elif fill_status in ("Cancelled", "Inactive"):
-            order_record.status = "cancelled"
-        elif fill_status == "Failed":
-            order_record.status = "failed"
+        order_record.updated_at = DB_UTC_NOW
+
+        # Update main status based on fill status (same table as verify_order_fill)
+        new_status, _ = STATUS_ACTIONS.get(fill_status, (None, False))
+        if new_status:
+            order_record.status = new_status
+        if fill_status == "Failed":
             order_record.error_message = status_info.get("msg", "") or order_record.error_message
-        elif fill_status in ("PendingSubmit", "PreSubmitted", "Submitted"):
-            order_record.status = "submitted"
-        
-        db.commit()
-        
+
+        await db.commit()
+
         return {
             "order_id": order_id,
             "previous_status": old_status,
@@ -777,42 +961,90 @@ async def recheck_order_status(
             "deals": deals,
             "message": f"Status updated: {old_status} -> {order_record.status}",
         }
-        
-    except (TimeoutError, ConnectionError) as e:
-        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
-    except Exception as e:
-        logger.exception(f"Error re-checking order {order_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Error checking order status: {e}")
+
+
+
+@app.post("/orders/{order_id}/recheck")
+async def recheck_order_status(
+    order_id: int,
+    _: str = Depends(verify_auth_key),
+    simulation: bool = Query(True, description="Use simulation mode"),
+):
+    """
+    Manually re-check an order's fill status from the exchange.
+    
+    This performs a single status check (not a background loop) and updates the database.
+    Useful for orders where the background task may have timed out or for manual verification.
+    Concurrent rechecks of one order share a single check, and its result is
+    returned again for RECHECK_CACHE_TTL seconds.
+    """
+    return await _rechecks.call(
+        (order_id, simulation),
+        lambda: run_order_recheck(order_id, simulation),
+        ttl=RECHECK_CACHE_TTL,
+    )
 
 
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+DASHBOARD_HTML = os.path.join(STATIC_DIR, "dashboard.html")
 
 # Mount static files directory for CSS, JS, etc.
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
+@app.post("/admin/cache/flush")
+async def flush_market_data_cache(
+    _: str = Depends(verify_auth_key),
+    queue_client: AsyncTradingQueueClient = Depends(get_queue_client),
+):
+    """
+    Drop cached futures/symbol/contract data in every API process, e.g. after
+    a contract rollover. Entries otherwise expire after MARKET_DATA_CACHE_TTL.
+    """
+    try:
+        await queue_client.flush_cache()
+    except redis.RedisError as e:
+        raise HTTPException(status_code=503, detail=f"Trading service unavailable: {e}")
+    return {"status": "flushed"}
+
+
 @app.get("/health")
 async def health_check():
-    """Check the health of the API and trading worker."""
-    try:
-        queue_client = get_queue_client()
-        worker_healthy = queue_client.check_worker_health()
-        
-        return {
-            "api": "healthy",
-            "trading_worker": "healthy" if worker_healthy else "unhealthy",
-            "redis": "connected",
-        }
-    except Exception as e:
+    """Check the health of the API, trading worker and database."""
+    # Answered from the in-process heartbeats; no Redis or database round-trip
+    monitor = app.state.trading_events
+    db_healthy = app.state.db_healthy
+    database = "unknown" if db_healthy is None else "connected" if db_healthy else "disconnected"
+    if not monitor.redis_connected:
         return {
             "api": "healthy",
             "trading_worker": "unknown",
             "redis": "disconnected",
-            "error": str(e),
+            "database": database,
         }
+    return {
+        "api": "healthy",
+        "trading_worker": "healthy" if monitor.worker_healthy else "unhealthy",
+        "redis": "connected",
+        "database": database,
+        "shioaji_sessions": monitor.sessions if monitor.worker_alive else {},
+        "shioaji_last_success": monitor.last_success if monitor.worker_alive else {},
+    }
+
+
+# Static liveness payload for container probes; no Redis/worker round-trip
+LIVENESS_BODY = b'{"api":"healthy"}'
+
+
+async def liveness_check(request):
+    """Liveness probe served as a plain Starlette route (no dependency solving)."""
+    return Response(content=LIVENESS_BODY, media_type="application/json")
+
+
+app.add_route("/health/live", liveness_check, include_in_schema=False)
 
 
 @app.get("/dashboard")
 async def dashboard():
     """Serve the dashboard HTML page."""
-    return FileResponse(os.path.join(STATIC_DIR, "dashboard.html"), media_type="text/html")
+    return FileResponse(DASHBOARD_HTML, media_type="text/html")
@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Float, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Float, Enum, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 import enum
 
 from database import Base
@@ -31,7 +32,7 @@ class OrderHistory(Base):
     action = Column(String, nullable=False)
     quantity = Column(Integer, nullable=False)
     status = Column(String, nullable=False)
-    order_result = Column(String, nullable=True)
+    order_result = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # Worker result dict
     error_message = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
@@ -47,6 +48,13 @@ class OrderHistory(Base):
     cancel_quantity = Column(Integer, nullable=True)  # Cancelled quantity
     updated_at = Column(DateTime, nullable=True)  # Last status update time
 
+    __table_args__ = (
+        # Filtered listings on /orders (see db/migrations/002 and 004)
+        Index("ix_order_history_status_symbol_created_at", status, symbol, created_at.desc()),
+        Index("ix_order_history_symbol_created_at", symbol, created_at.desc()),
+        Index("ix_order_history_status_created_at", status, created_at.desc()),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 import shioaji as sj
 from shioaji.contracts import Contract
@@ -108,6 +108,24 @@ def _get_futures_contracts(api: sj.Shioaji) -> List[Contract]:
     return contracts
 
 
+def build_symbol_index(api: sj.Shioaji) -> Optional[Dict[str, Contract]]:
+    """
+    Map symbol -> contract for the supported futures.
+
+    Returns None while any product is missing from api.Contracts.Futures
+    (contracts still loading after login), so callers never cache a partial index.
+    """
+    index = {}
+    for product in SUPPORTED_FUTURES:
+        product_contracts = getattr(api.Contracts.Futures, product, None)
+        if not product_contracts:
+            return None
+        for contract in product_contracts:
+            if contract.symbol.startswith(product):
+                index.setdefault(contract.symbol, contract)
+    return index
+
+
 def get_valid_symbols(api: sj.Shioaji) -> List[str]:
     """Get all valid trading symbols from supported futures."""
     return [contract.symbol for contract in _get_futures_contracts(api)]
@@ -137,11 +155,18 @@ def get_valid_contract_codes(api: sj.Shioaji) -> List[str]:
     return [contract.code for contract in _get_futures_contracts(api)]
 
 
-def get_contract_from_symbol(api: sj.Shioaji, symbol: str) -> Contract:
-    """Find a contract by its symbol."""
-    for contract in _get_futures_contracts(api):
-        if contract.symbol == symbol:
+def get_contract_from_symbol(
+    api: sj.Shioaji, symbol: str, symbol_index: Optional[Dict[str, Contract]] = None
+) -> Contract:
+    """Find a contract by its symbol, using symbol_index when the caller has one."""
+    if symbol_index is not None:
+        contract = symbol_index.get(symbol)
+        if contract is not None:
             return contract
+    else:
+        for contract in _get_futures_contracts(api):
+            if contract.symbol == symbol:
+                return contract
     raise ValueError(f"Contract {symbol} not found in supported futures: {SUPPORTED_FUTURES}")
 
 
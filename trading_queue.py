@@ -4,16 +4,23 @@ Trading Queue - Redis-based communication interface for Shioaji operations.
 This module provides a request/response pattern using Redis for communication
 between FastAPI workers and the dedicated trading worker that maintains
 the Shioaji connection.
+
+AsyncTradingQueueClient exposes the operations as coroutines for use from
+FastAPI endpoints, so waiting on the worker never blocks the event loop.
 """
-import json
+import asyncio
+import functools
 import logging
 import os
+import time
 import uuid
 from dataclasses import dataclass, asdict
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Optional, Union
 from enum import Enum
 
+import orjson
 import redis
+import redis.asyncio as aioredis
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +28,14 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 REQUEST_QUEUE = "trading:requests"
 RESPONSE_PREFIX = "trading:response:"
 REQUEST_TIMEOUT = 30  # seconds to wait for response
+REDIS_POOL_MAX = int(os.getenv("REDIS_POOL_MAX", "100"))  # connections per process
+REDIS_POOL_WARM = int(os.getenv("REDIS_POOL_WARM", "10"))  # connections opened at startup
+HEARTBEAT_CHANNEL = "trading:heartbeat"
+HEARTBEAT_INTERVAL = 5  # seconds between worker heartbeats
+HEARTBEAT_TIMEOUT = 3 * HEARTBEAT_INTERVAL  # worker is unhealthy after this much silence
+MARKET_DATA_CACHE_TTL = int(os.getenv("MARKET_DATA_CACHE_TTL", "60"))  # seconds, 0 disables
+CACHE_FLUSH_CHANNEL = "trading:cache:flush"
+ORDER_UPDATES_PREFIX = "order_updates:"  # + order id; worker publishes on order/deal events
 
 
 class TradingOperation(str, Enum):
@@ -45,12 +60,12 @@ class TradingRequest:
     simulation: bool
     params: dict
 
-    def to_json(self) -> str:
-        return json.dumps(asdict(self))
+    def to_json(self) -> bytes:
+        return orjson.dumps(asdict(self), option=orjson.OPT_NON_STR_KEYS)
 
     @classmethod
-    def from_json(cls, data: str) -> "TradingRequest":
-        d = json.loads(data)
+    def from_json(cls, data: Union[str, bytes]) -> "TradingRequest":
+        d = orjson.loads(data)
         return cls(**d)
 
 
@@ -62,35 +77,98 @@ class TradingResponse:
     data: Optional[Any] = None
     error: Optional[str] = None
 
-    def to_json(self) -> str:
-        return json.dumps(asdict(self))
+    def to_json(self) -> bytes:
+        return orjson.dumps(asdict(self), option=orjson.OPT_NON_STR_KEYS)
 
     @classmethod
-    def from_json(cls, data: str) -> "TradingResponse":
-        d = json.loads(data)
+    def from_json(cls, data: Union[str, bytes]) -> "TradingResponse":
+        d = orjson.loads(data)
         return cls(**d)
 
 
-class TradingQueueClient:
+@functools.lru_cache(maxsize=None)
+def get_async_connection_pool(redis_url: str = REDIS_URL) -> aioredis.ConnectionPool:
     """
-    Client for submitting trading requests to the queue.
-    Used by FastAPI workers to communicate with the trading worker.
+    Get the process-wide asyncio connection pool for a Redis URL.
+
+    Each in-flight request holds a connection while it waits on BLPOP, so the
+    pool is bounded and blocks (rather than erroring) when exhausted.
     """
+    return aioredis.BlockingConnectionPool.from_url(
+        redis_url,
+        max_connections=REDIS_POOL_MAX,
+        timeout=REQUEST_TIMEOUT,
+        decode_responses=True,
+        socket_keepalive=True,
+    )
 
-    def __init__(self, redis_url: str = REDIS_URL):
-        self.redis = redis.from_url(redis_url, decode_responses=True)
-        self._check_connection()
 
-    def _check_connection(self):
-        """Verify Redis connection is working."""
-        try:
-            self.redis.ping()
-            logger.debug("Redis connection established")
-        except redis.ConnectionError as e:
-            logger.error(f"Failed to connect to Redis: {e}")
-            raise
+class SharedCalls:
+    """
+    Single-flight calls with an optional short-lived result cache.
+
+    Concurrent calls with the same key share one in-flight future instead of
+    each running the coroutine; with a ttl the result is also reused for that
+    many seconds.
+    """
+
+    def __init__(self):
+        self._inflight: dict = {}
+        self._cache: dict = {}  # key -> (expires_at, result)
+
+    async def call(
+        self,
+        key,
+        coro_factory: Callable[[], Awaitable[Any]],
+        ttl: float = 0,
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Run coro_factory() once per key at a time; cache the result for ttl seconds if cache_if allows."""
+        if ttl:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(coro_factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one caller disconnecting doesn't cancel the call for the others
+        result = await asyncio.shield(future)
+
+        if ttl and (cache_if is None or cache_if(result)):
+            now = time.monotonic()
+            # Drop expired entries so keys from one-off calls don't accumulate
+            for stale in [k for k, (expires_at, _) in self._cache.items() if expires_at <= now]:
+                del self._cache[stale]
+            self._cache[key] = (now + ttl, result)
+        return result
+
+    def clear(self) -> int:
+        """Drop all cached results; returns how many were dropped."""
+        count = len(self._cache)
+        self._cache.clear()
+        return count
+
+
+class AsyncTradingQueueClient:
+    """
+    Asyncio client for submitting trading requests to the queue.
+    Used by FastAPI workers to communicate with the trading worker.
+    """
 
-    def submit_request(
+    def __init__(
+        self,
+        redis_url: str = REDIS_URL,
+        connection_pool: Optional[aioredis.ConnectionPool] = None,
+    ):
+        if connection_pool is None:
+            connection_pool = get_async_connection_pool(redis_url)
+        self.redis = aioredis.Redis(connection_pool=connection_pool)
+        self._shared = SharedCalls()
+
+    async def submit_request(
         self,
         operation: TradingOperation,
         simulation: bool = True,
@@ -100,15 +178,6 @@ class TradingQueueClient:
         """
         Submit a trading request and wait for response.
 
-        Args:
-            operation: The trading operation to perform
-            simulation: Whether to use simulation mode
-            params: Operation-specific parameters
-            timeout: Seconds to wait for response
-
-        Returns:
-            TradingResponse with the result
-
         Raises:
             TimeoutError: If no response received within timeout
             ConnectionError: If Redis connection fails
@@ -124,12 +193,10 @@ class TradingQueueClient:
         response_key = f"{RESPONSE_PREFIX}{request_id}"
 
         try:
-            # Push request to queue
-            self.redis.rpush(REQUEST_QUEUE, request.to_json())
+            await self.redis.rpush(REQUEST_QUEUE, request.to_json())
             logger.debug(f"Submitted request {request_id}: {operation.value}")
 
-            # Wait for response with blocking pop
-            result = self.redis.blpop(response_key, timeout=timeout)
+            result = await self.redis.blpop(response_key, timeout=timeout)
 
             if result is None:
                 logger.error(f"Request {request_id} timed out after {timeout}s")
@@ -145,53 +212,83 @@ class TradingQueueClient:
             logger.error(f"Redis connection error: {e}")
             raise ConnectionError(f"Failed to communicate with trading queue: {e}")
 
-    def check_worker_health(self) -> bool:
-        """Check if the trading worker is healthy by sending a ping."""
-        try:
-            response = self.submit_request(
-                TradingOperation.PING,
-                simulation=True,
-                timeout=5,
-            )
-            return response.success
-        except (TimeoutError, ConnectionError):
-            return False
-
-    def get_symbols(self, simulation: bool = True) -> TradingResponse:
+    async def warm_up(self, connections: int = REDIS_POOL_WARM):
+        """Open pool connections ahead of the first requests with parallel PINGs."""
+        await asyncio.gather(*(self.redis.ping() for _ in range(connections)))
+
+    async def submit_shared_request(
+        self,
+        operation: TradingOperation,
+        simulation: bool = True,
+        params: Optional[dict] = None,
+        cache_ttl: float = 0,
+    ) -> TradingResponse:
+        """
+        Submit a read-only request, sharing one in-flight call between
+        concurrent identical requests instead of queueing duplicates.
+
+        With cache_ttl, successful responses are also reused for that many
+        seconds; failures are never cached.
+        """
+        key = (operation, simulation, tuple(sorted((params or {}).items())))
+        return await self._shared.call(
+            key,
+            lambda: self.submit_request(operation, simulation, params),
+            ttl=cache_ttl,
+            cache_if=lambda response: response.success,
+        )
+
+    def clear_cache(self) -> int:
+        """Drop this process's cached responses; returns how many were dropped."""
+        return self._shared.clear()
+
+    async def flush_cache(self):
+        """Ask every API process (including this one) to drop its cached responses."""
+        await self.redis.publish(CACHE_FLUSH_CHANNEL, 1)
+
+    async def get_symbols(self, simulation: bool = True) -> TradingResponse:
         """Get valid trading symbols."""
-        return self.submit_request(TradingOperation.GET_SYMBOLS, simulation)
+        return await self.submit_shared_request(
+            TradingOperation.GET_SYMBOLS, simulation, cache_ttl=MARKET_DATA_CACHE_TTL
+        )
 
-    def get_symbol_info(self, symbol: str, simulation: bool = True) -> TradingResponse:
+    async def get_symbol_info(self, symbol: str, simulation: bool = True) -> TradingResponse:
         """Get detailed info for a specific symbol."""
-        return self.submit_request(
+        return await self.submit_shared_request(
             TradingOperation.GET_SYMBOL_INFO,
             simulation,
             params={"symbol": symbol},
+            cache_ttl=MARKET_DATA_CACHE_TTL,
         )
 
-    def get_contract_codes(self, simulation: bool = True) -> TradingResponse:
+    async def get_contract_codes(self, simulation: bool = True) -> TradingResponse:
         """Get valid contract codes."""
-        return self.submit_request(TradingOperation.GET_CONTRACT_CODES, simulation)
+        return await self.submit_shared_request(
+            TradingOperation.GET_CONTRACT_CODES, simulation, cache_ttl=MARKET_DATA_CACHE_TTL
+        )
 
-    def get_positions(self, simulation: bool = True) -> TradingResponse:
+    async def get_positions(self, simulation: bool = True) -> TradingResponse:
         """Get current positions."""
-        return self.submit_request(TradingOperation.GET_POSITIONS, simulation)
+        return await self.submit_shared_request(TradingOperation.GET_POSITIONS, simulation)
 
-    def get_futures_overview(self, simulation: bool = True) -> TradingResponse:
+    async def get_futures_overview(self, simulation: bool = True) -> TradingResponse:
         """Get overview of all futures products."""
-        return self.submit_request(TradingOperation.GET_FUTURES_OVERVIEW, simulation)
+        return await self.submit_shared_request(
+            TradingOperation.GET_FUTURES_OVERVIEW, simulation, cache_ttl=MARKET_DATA_CACHE_TTL
+        )
 
-    def get_product_contracts(
+    async def get_product_contracts(
         self, product: str, simulation: bool = True
     ) -> TradingResponse:
         """Get all contracts for a specific product."""
-        return self.submit_request(
+        return await self.submit_shared_request(
             TradingOperation.GET_PRODUCT_CONTRACTS,
             simulation,
-            params={"product": product},
+            params={"product": product.upper()},  # one cache entry for txf/TXF
+            cache_ttl=MARKET_DATA_CACHE_TTL,
         )
 
-    def place_entry_order(
+    async def place_entry_order(
         self,
         symbol: str,
         quantity: int,
@@ -199,33 +296,33 @@ class TradingQueueClient:
         simulation: bool = True,
     ) -> TradingResponse:
         """Place an entry order."""
-        return self.submit_request(
+        return await self.submit_request(
             TradingOperation.PLACE_ENTRY_ORDER,
             simulation,
             params={"symbol": symbol, "quantity": quantity, "action": action},
         )
 
-    def place_exit_order(
+    async def place_exit_order(
         self,
         symbol: str,
         position_direction: str,
         simulation: bool = True,
     ) -> TradingResponse:
         """Place an exit order."""
-        return self.submit_request(
+        return await self.submit_request(
             TradingOperation.PLACE_EXIT_ORDER,
             simulation,
             params={"symbol": symbol, "position_direction": position_direction},
         )
 
-    def check_order_status(
+    async def check_order_status(
         self,
         order_id: str,
         seqno: str,
         simulation: bool = True,
     ) -> TradingResponse:
         """Check status of an order."""
-        return self.submit_request(
+        return await self.submit_request(
             TradingOperation.CHECK_ORDER_STATUS,
             simulation,
             params={"order_id": order_id, "seqno": seqno},
@@ -233,14 +330,93 @@ class TradingQueueClient:
         )
 
 
-# Singleton instance for FastAPI workers
-_queue_client: Optional[TradingQueueClient] = None
+@functools.lru_cache(maxsize=1)
+def get_async_queue_client() -> AsyncTradingQueueClient:
+    """Get or create the singleton asyncio queue client."""
+    return AsyncTradingQueueClient()
+
 
+class TradingEventListener:
+    """
+    Process-wide subscriber for broadcasts on Redis pub/sub.
+
+    run() is started once per API process on a single pub/sub connection and
+    handles:
+    - worker heartbeats: keeps the latest heartbeat time and the worker's
+      reported Shioaji session state in memory, so health checks answer
+      without a Redis or worker round-trip
+    - cache flushes broadcast by flush_cache(): drops this process's
+      market-data cache
+    - order events (ORDER_UPDATES_PREFIX + order id): sets the asyncio.Event
+      of an order registered with watch_order(), so all verifications share
+      this one connection instead of holding a pooled one each
+    """
 
-def get_queue_client() -> TradingQueueClient:
-    """Get or create the singleton queue client."""
-    global _queue_client
-    if _queue_client is None:
-        _queue_client = TradingQueueClient()
-    return _queue_client
+    def __init__(self, connection_pool: Optional[aioredis.ConnectionPool] = None):
+        self.redis = aioredis.Redis(connection_pool=connection_pool or get_async_connection_pool())
+        self.redis_connected = False
+        self.last_heartbeat: Optional[float] = None
+        self.sessions: dict = {}  # mode -> logged in, from the latest heartbeat
+        self.last_success: dict = {}  # mode -> unix time of the last successful request
+        self._order_events: dict = {}  # order id -> asyncio.Event
+
+    @property
+    def worker_alive(self) -> bool:
+        return (
+            self.last_heartbeat is not None
+            and time.monotonic() - self.last_heartbeat < HEARTBEAT_TIMEOUT
+        )
 
+    @property
+    def worker_healthy(self) -> bool:
+        """Alive and logged in to Shioaji in at least one mode."""
+        return self.worker_alive and any(self.sessions.values())
+
+    def _record_heartbeat(self, data: Union[str, bytes]):
+        self.last_heartbeat = time.monotonic()
+        try:
+            state = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            state = None
+        if not isinstance(state, dict):
+            state = {}  # heartbeat without session state: treat as not logged in
+        self.sessions = state.get("sessions") or {}
+        self.last_success = state.get("last_success") or {}
+
+    def watch_order(self, order_id: str) -> asyncio.Event:
+        """Event set on each worker event for order_id; the waiter clears it. Pair with unwatch_order."""
+        return self._order_events.setdefault(order_id, asyncio.Event())
+
+    def unwatch_order(self, order_id: str):
+        self._order_events.pop(order_id, None)
+
+    async def run(self):
+        """Subscribe to the broadcast channels, resubscribing after Redis errors."""
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(HEARTBEAT_CHANNEL, CACHE_FLUSH_CHANNEL)
+                    await pubsub.psubscribe(f"{ORDER_UPDATES_PREFIX}*")
+                    self.redis_connected = True
+                    # Flushes and order events may have been missed while unsubscribed
+                    get_async_queue_client().clear_cache()
+                    for event in self._order_events.values():
+                        event.set()
+                    async for message in pubsub.listen():
+                        if message["type"] == "pmessage":
+                            event = self._order_events.get(message["channel"][len(ORDER_UPDATES_PREFIX):])
+                            if event is not None:
+                                event.set()
+                        elif message["type"] != "message":
+                            continue
+                        elif message["channel"] == HEARTBEAT_CHANNEL:
+                            self._record_heartbeat(message["data"])
+                        elif message["channel"] == CACHE_FLUSH_CHANNEL:
+                            dropped = get_async_queue_client().clear_cache()
+                            logger.info(f"Market data cache flushed ({dropped} entries)")
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                logger.warning(f"Trading event subscription lost: {e}")
+            except Exception:
+                logger.exception("Trading event listener failed, resubscribing")
+            self.redis_connected = False
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
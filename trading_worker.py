@@ -11,7 +11,6 @@ Features:
 - Graceful shutdown handling
 - Health monitoring
 """
-import json
 import logging
 import os
 import signal
@@ -20,6 +19,7 @@ import threading
 import time
 from typing import Optional, Dict, Any
 
+import orjson
 import redis
 import shioaji as sj
 from shioaji.error import (
@@ -38,6 +38,9 @@ from trading_queue import (
     REQUEST_QUEUE,
     RESPONSE_PREFIX,
     REDIS_URL,
+    HEARTBEAT_CHANNEL,
+    HEARTBEAT_INTERVAL,
+    ORDER_UPDATES_PREFIX,
 )
 from trading import (
     SUPPORTED_FUTURES,
@@ -45,6 +48,7 @@ from trading import (
     get_valid_symbols_with_info,
     get_valid_contract_codes,
     get_contract_from_symbol,
+    build_symbol_index,
     get_current_position,
 )
 
@@ -64,6 +68,29 @@ HEALTH_CHECK_INTERVAL = 300  # 5 minutes - check connection health periodically
 CONNECTION_LOGOUT_TIMEOUT = 3  # seconds to wait for logout before giving up
 MAX_REQUEST_RETRIES = 3  # max retries for requests on connection errors
 REQUEST_RETRY_DELAY = 1  # seconds between request retries
+SYMBOL_INDEX_TTL = 300  # seconds; contracts only change on rollover
+SESSION_TRADES_TTL = 1  # seconds a list_trades() seqno map is reused for status checks
+
+# Lowercased error substrings, matched against every failed response/exception
+RETRYABLE_ERROR_PATTERNS = (
+    "token is expired",
+    "token expired",
+    "tokenerror",
+    "connection error",
+    "401",
+    "session down",
+    "not ready",
+)
+CONNECTION_ERROR_PATTERNS = (
+    "token is expired",
+    "token expired",
+    "status_code': 401",
+    "statuscode: 401",
+    "not ready",
+    "session down",
+    "connection refused",
+    "connection reset",
+)
 
 
 class TradingWorker:
@@ -84,6 +111,13 @@ class TradingWorker:
             False: None,  # real trading
         }
         self.pending_trades: Dict[str, Any] = {}  # Store trades for status checking
+        # simulation -> (built_at, {symbol: Contract}); only complete indexes are stored
+        self._symbol_index: Dict[bool, Optional[tuple]] = {
+            True: None,
+            False: None,
+        }
+        # simulation -> (api, fetched_at, {seqno: trade}) for trades placed before a restart
+        self._session_trades: Dict[bool, tuple] = {}
         
         # Track connection health
         self._last_successful_request: Dict[bool, float] = {
@@ -143,6 +177,32 @@ class TradingWorker:
             # Event callbacks are optional - don't fail if they can't be set up
             logger.debug(f"Could not set up event callbacks: {e}")
 
+    def _setup_order_callback(self, api: sj.Shioaji, simulation: bool):
+        """
+        Publish order and deal events from the exchange to ORDER_UPDATES_PREFIX + order id.
+
+        The API's verify_order_fill subscribes to these and re-checks the order
+        right away instead of waiting for its next poll. The payload is only a
+        wake-up; the status itself is still read via check_order_status.
+        """
+        mode_str = "simulation" if simulation else "real"
+
+        def order_callback(stat, msg: dict):
+            try:
+                # Deal events carry the order id as trade_id; order events nest it
+                order_id = msg.get("trade_id") or (msg.get("order") or {}).get("id")
+                if order_id:
+                    self.redis.publish(f"{ORDER_UPDATES_PREFIX}{order_id}", str(stat))
+                logger.debug(f"[{mode_str}] Order event {stat} for order {order_id}")
+            except Exception as e:
+                logger.warning(f"[{mode_str}] Failed to publish order event: {e}")
+
+        try:
+            api.set_order_callback(order_callback)
+        except Exception as e:
+            # Verification falls back to polling without events
+            logger.warning(f"Could not set up order callback: {e}")
+
     def _get_api_client(self, simulation: bool) -> sj.Shioaji:
         """
         Get or create an API client for the specified mode.
@@ -168,6 +228,7 @@ class TradingWorker:
 
                 # Set up event callbacks for session monitoring
                 self._setup_event_callbacks(api, simulation)
+                self._setup_order_callback(api, simulation)
                 
                 # Activate CA for real trading
                 if not simulation:
@@ -245,6 +306,7 @@ class TradingWorker:
             # This prevents the garbage collector from trying to logout later
             old_api = self.api_clients[simulation]
             self.api_clients[simulation] = None
+            self._symbol_index[simulation] = None
             
             # Try to logout gracefully, but don't block for too long
             try:
@@ -354,15 +416,7 @@ class TradingWorker:
             # Check if it's a connection error that should be retried
             if not response.success and response.error:
                 error_lower = response.error.lower()
-                is_retryable = any(pattern in error_lower for pattern in [
-                    "token is expired",
-                    "token expired",
-                    "tokenerror",
-                    "connection error",
-                    "401",
-                    "session down",
-                    "not ready",
-                ])
+                is_retryable = any(pattern in error_lower for pattern in RETRYABLE_ERROR_PATTERNS)
                 
                 if is_retryable and attempt < MAX_REQUEST_RETRIES:
                     logger.warning(
@@ -392,14 +446,14 @@ class TradingWorker:
         try:
             api = self._get_api_client(simulation)
 
-            if operation == TradingOperation.PING.value:
+            if operation == TradingOperation.PING:
                 return TradingResponse(
                     request_id=request.request_id,
                     success=True,
                     data={"status": "healthy", "simulation": simulation},
                 )
 
-            elif operation == TradingOperation.GET_SYMBOLS.value:
+            elif operation == TradingOperation.GET_SYMBOLS:
                 symbols_info = get_valid_symbols_with_info(api)
                 return TradingResponse(
                     request_id=request.request_id,
@@ -407,9 +461,9 @@ class TradingWorker:
                     data={"symbols": symbols_info, "count": len(symbols_info)},
                 )
 
-            elif operation == TradingOperation.GET_SYMBOL_INFO.value:
+            elif operation == TradingOperation.GET_SYMBOL_INFO:
                 symbol = params["symbol"]
-                contract = get_contract_from_symbol(api, symbol)
+                contract = get_contract_from_symbol(api, symbol, self._get_symbol_index(api, simulation))
                 return TradingResponse(
                     request_id=request.request_id,
                     success=True,
@@ -426,7 +480,7 @@ class TradingWorker:
                     },
                 )
 
-            elif operation == TradingOperation.GET_CONTRACT_CODES.value:
+            elif operation == TradingOperation.GET_CONTRACT_CODES:
                 codes = get_valid_contract_codes(api)
                 return TradingResponse(
                     request_id=request.request_id,
@@ -434,7 +488,7 @@ class TradingWorker:
                     data={"contracts": codes, "count": len(codes)},
                 )
 
-            elif operation == TradingOperation.GET_POSITIONS.value:
+            elif operation == TradingOperation.GET_POSITIONS:
                 positions = api.list_positions(api.futopt_account)
                 
                 # Build code-to-symbol mapping from ALL futures contracts
@@ -471,7 +525,7 @@ class TradingWorker:
                     data={"positions": positions_data, "count": len(positions_data)},
                 )
 
-            elif operation == TradingOperation.GET_FUTURES_OVERVIEW.value:
+            elif operation == TradingOperation.GET_FUTURES_OVERVIEW:
                 futures = api.Contracts.Futures
                 products = []
                 for product_name in dir(futures):
@@ -496,7 +550,7 @@ class TradingWorker:
                     data={"products": products},
                 )
 
-            elif operation == TradingOperation.GET_PRODUCT_CONTRACTS.value:
+            elif operation == TradingOperation.GET_PRODUCT_CONTRACTS:
                 product = params["product"].upper()
                 product_contracts = getattr(api.Contracts.Futures, product, None)
                 if not product_contracts:
@@ -522,13 +576,13 @@ class TradingWorker:
                     data={"product": product, "contracts": contracts, "count": len(contracts)},
                 )
 
-            elif operation == TradingOperation.PLACE_ENTRY_ORDER.value:
+            elif operation == TradingOperation.PLACE_ENTRY_ORDER:
                 return self._handle_entry_order(api, request)
 
-            elif operation == TradingOperation.PLACE_EXIT_ORDER.value:
+            elif operation == TradingOperation.PLACE_EXIT_ORDER:
                 return self._handle_exit_order(api, request)
 
-            elif operation == TradingOperation.CHECK_ORDER_STATUS.value:
+            elif operation == TradingOperation.CHECK_ORDER_STATUS:
                 return self._handle_check_order_status(api, request)
 
             else:
@@ -552,19 +606,10 @@ class TradingWorker:
         except Exception as e:
             error_str = str(e)
             # Check for common connection-related error patterns in exception message
-            connection_error_patterns = [
-                "token is expired",
-                "token expired", 
-                "status_code': 401",
-                "statuscode: 401",
-                "not ready",
-                "session down",
-                "connection refused",
-                "connection reset",
-            ]
+            error_lower = error_str.lower()
             is_connection_error = any(
-                pattern in error_str.lower() 
-                for pattern in connection_error_patterns
+                pattern in error_lower
+                for pattern in CONNECTION_ERROR_PATTERNS
             )
             
             if is_connection_error:
@@ -593,7 +638,7 @@ class TradingWorker:
         action = sj.constant.Action.Buy if action_str == "Buy" else sj.constant.Action.Sell
 
         try:
-            contract = get_contract_from_symbol(api, symbol)
+            contract = get_contract_from_symbol(api, symbol, self._get_symbol_index(api, request.simulation))
             current_position = get_current_position(api, contract) or 0
 
             # Adjust quantity for position reversal
@@ -654,7 +699,7 @@ class TradingWorker:
         )
 
         try:
-            contract = get_contract_from_symbol(api, symbol)
+            contract = get_contract_from_symbol(api, symbol, self._get_symbol_index(api, request.simulation))
             current_position = get_current_position(api, contract) or 0
 
             # Determine exit action and quantity
@@ -708,6 +753,32 @@ class TradingWorker:
                 error=str(e),
             )
 
+    def _get_symbol_index(self, api: sj.Shioaji, simulation: bool) -> Optional[dict]:
+        """
+        Symbol -> contract index for this mode's client, rebuilt every SYMBOL_INDEX_TTL.
+        None (callers fall back to a scan) until contracts have finished loading.
+        """
+        cached = self._symbol_index[simulation]
+        if cached is not None and time.time() - cached[0] < SYMBOL_INDEX_TTL:
+            return cached[1]
+        index = build_symbol_index(api)
+        if index is not None:
+            self._symbol_index[simulation] = (time.time(), index)
+        return index
+
+    def _find_session_trade(self, api: sj.Shioaji, simulation: bool, seqno: str):
+        """
+        Find a trade of the current session by seqno, for orders this process
+        did not place (e.g. before a worker restart). The seqno map is reused
+        for SESSION_TRADES_TTL so a burst of rechecks shares one list_trades().
+        """
+        cached = self._session_trades.get(simulation)
+        if cached is None or cached[0] is not api or time.time() - cached[1] >= SESSION_TRADES_TTL:
+            api.update_status(api.futopt_account)
+            cached = (api, time.time(), {t.order.seqno: t for t in api.list_trades()})
+            self._session_trades[simulation] = cached
+        return cached[2].get(seqno)
+
     def _handle_check_order_status(self, api: sj.Shioaji, request: TradingRequest) -> TradingResponse:
         """Handle order status check."""
         params = request.params
@@ -717,6 +788,15 @@ class TradingWorker:
         trade_key = f"{order_id}:{seqno}"
         trade = self.pending_trades.get(trade_key)
 
+        if not trade:
+            # Lookup errors propagate so _handle_request_inner can reconnect on
+            # session/token failures; only a genuine miss means "not found"
+            trade = self._find_session_trade(api, request.simulation, seqno)
+            if trade is not None and trade.order.id != order_id:
+                trade = None
+            if trade is not None:
+                self.pending_trades[trade_key] = trade
+
         if not trade:
             return TradingResponse(
                 request_id=request.request_id,
@@ -773,6 +853,20 @@ class TradingWorker:
                 error=str(e),
             )
 
+    def _heartbeat_payload(self, now: float) -> bytes:
+        """Heartbeat message: publish time plus which Shioaji sessions are logged in."""
+        return orjson.dumps({
+            "ts": int(now),
+            "sessions": {
+                "simulation": self.api_clients[True] is not None,
+                "real": self.api_clients[False] is not None,
+            },
+            "last_success": {
+                "simulation": int(self._last_successful_request[True]) or None,
+                "real": int(self._last_successful_request[False]) or None,
+            },
+        })
+
     def run(self):
         """Main loop - process requests from the queue."""
         logger.info("Trading worker starting...")
@@ -790,9 +884,16 @@ class TradingWorker:
         logger.info(f"Listening for requests on queue: {REQUEST_QUEUE}")
 
         last_health_check = time.time()
+        last_heartbeat = 0.0
         
         while self.running:
             try:
+                # Announce liveness and session state to API processes (see TradingEventListener)
+                now = time.time()
+                if now - last_heartbeat >= HEARTBEAT_INTERVAL:
+                    self.redis.publish(HEARTBEAT_CHANNEL, self._heartbeat_payload(now))
+                    last_heartbeat = now
+
                 # Block waiting for request with timeout
                 result = self.redis.blpop(REQUEST_QUEUE, timeout=QUEUE_POLL_TIMEOUT)
 
@@ -804,6 +905,12 @@ class TradingWorker:
                         for sim_mode in [True, False]:
                             if self.api_clients.get(sim_mode) is not None:
                                 self._maybe_refresh_connection(sim_mode)
+                        # Without this a failed startup login is only retried by the next request
+                        if self.api_clients.get(True) is None:
+                            try:
+                                self._get_api_client(simulation=True)
+                            except Exception as e:
+                                logger.warning(f"Simulation login retry failed: {e}")
                         last_health_check = current_time
                     continue
 